@@ -1,6 +1,15 @@
 
+import hashlib
+import mmap
 import os
+import pickle
+import tempfile
 import yaml
+try:
+    # libyaml-backed parser, noticeably faster than the pure-Python one
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dotenv import load_dotenv
@@ -16,6 +25,7 @@ class Config:
         self.config_path = Path(config_path)
         self._config = self._load_config()
         self._validate_config()
+        self._flat = self._flatten(self._config)
         
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from YAML file"""
@@ -24,16 +34,54 @@ class Config:
                 logger.warning(f"Config file {self.config_path} not found, using defaults")
                 return self._get_default_config()
                 
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                
+            config = self._load_yaml_cached()
+
             # Override with environment variables
             self._override_with_env(config)
             return config
-            
+
         except Exception as e:
             logger.error(f"Error loading config: {e}")
             return self._get_default_config()
+
+    def _cache_path(self) -> Path:
+        path_hash = hashlib.md5(str(self.config_path.resolve()).encode()).hexdigest()[:12]
+        return Path.home() / '.cache' / 'unileipzig_rag' / f'config-{path_hash}.pkl'
+
+    def _load_yaml_cached(self) -> Dict[str, Any]:
+        """Load YAML, reusing a pickled parse keyed on the file's mtime and size"""
+        stat = self.config_path.stat()
+        cache_key = (stat.st_mtime_ns, stat.st_size)
+        cache_path = self._cache_path()
+
+        try:
+            with open(cache_path, 'rb') as f:
+                stored_key, config = pickle.load(f)
+            if stored_key == cache_key:
+                return config
+        except (OSError, pickle.UnpicklingError, ValueError, EOFError):
+            pass
+
+        # Memory-map the file so yaml reads the kernel page cache directly
+        # instead of copying the bytes into a Python string first
+        with open(self.config_path, 'rb') as f:
+            if stat.st_size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    config = yaml.load(mm, Loader=_YamlLoader)
+            else:
+                config = yaml.load(f, Loader=_YamlLoader)
+
+        # Env overrides are applied after loading, so caching the raw parse is safe
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((cache_key, config), f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.debug(f"Could not write config cache: {e}")
+
+        return config
     
     def _override_with_env(self, config: Dict[str, Any]) -> None:
         if os.getenv('OLLAMA_HOST'):
@@ -60,12 +108,17 @@ class Config:
                 'base_url': 'http://localhost:11434',
                 'model': 'llama3.1:8b',
                 'temperature': 0.1,
-                'max_tokens': 2048
+                'max_tokens': 2048,
+                'connect_timeout': 10,
+                'read_timeout': 600,
+                'keep_alive': '5m'
             },
             'documents': {
+                'embedding_backend': 'spacy',
                 'processing': {
                     'chunk_size': 500,
                     'chunk_overlap': 50,
+                    'min_chunk_size': 30,
                     'max_file_size_mb': 50
                 }
             },
@@ -86,16 +139,18 @@ class Config:
             if key not in self._config:
                 raise ValueError(f"Missing required configuration key: {key}")
     
+    def _flatten(self, config: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+        """Map every dotted key path to its value so get() is a single dict lookup"""
+        flat = {}
+        for key, value in config.items():
+            key_path = f"{prefix}{key}"
+            flat[key_path] = value
+            if isinstance(value, dict):
+                flat.update(self._flatten(value, f"{key_path}."))
+        return flat
+
     def get(self, key_path: str, default: Any = None) -> Any:
-        keys = key_path.split('.')
-        value = self._config
-        
-        try:
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return default
+        return self._flat.get(key_path, default)
     
     def get_ollama_config(self) -> Dict[str, Any]:
         return self._config['ollama']
@@ -109,5 +164,23 @@ class Config:
     def get_document_config(self) -> Dict[str, Any]:
         return self._config['documents']
 
-# Global config instance
-config = Config()
\ No newline at end of file
+# Global config instance, created lazily so importing this module (for
+# example in forked PDF workers) does not parse YAML until config is used
+_config_instance: Optional[Config] = None
+
+
+def get_config() -> Config:
+    global _config_instance
+    if _config_instance is None:
+        _config_instance = Config()
+    return _config_instance
+
+
+class _LazyConfig:
+    """Proxy that defers Config construction to the first attribute access"""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_config(), name)
+
+
+config = _LazyConfig()
\ No newline at end of file
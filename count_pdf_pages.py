@@ -1,8 +1,9 @@
 import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 from tqdm import tqdm
 
@@ -11,12 +12,18 @@ project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root))
 
 from logging_config import get_logger, setup_logging
+from pdf_utils import open_pdf
 
 
 setup_logging(log_level="INFO")
 logger = get_logger(__name__)
 
 
+def _count_pages(pdf_path: Path) -> int:
+    """Count pages of one PDF (top-level so it can run in a worker process)"""
+    return len(open_pdf(pdf_path).pages)
+
+
 def count_pages_in_directory(directory: Path) -> tuple[int, int, int]:
 
     if not directory.is_dir():
@@ -33,16 +40,19 @@ def count_pages_in_directory(directory: Path) -> tuple[int, int, int]:
 
     logger.info(f"Found {len(pdf_files)} PDF files. Counting pages...")
 
-    for pdf_path in tqdm(pdf_files, desc="Counting PDF pages"):
-        try:
-            reader = PdfReader(pdf_path)
-            total_pages += len(reader.pages)
-        except PdfReadError as e:
-            logger.warning(f"Could not read '{pdf_path.name}': {e}")
-            error_count += 1
-        except Exception as e:
-            logger.error(f"An unexpected error occurred with '{pdf_path.name}': {e}")
-            error_count += 1
+    max_workers = min(os.cpu_count() or 1, 6)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_count_pages, pdf_path): pdf_path for pdf_path in pdf_files}
+        for future in tqdm(as_completed(futures), total=len(pdf_files), desc="Counting PDF pages"):
+            pdf_path = futures[future]
+            try:
+                total_pages += future.result()
+            except PdfReadError as e:
+                logger.warning(f"Could not read '{pdf_path.name}': {e}")
+                error_count += 1
+            except Exception as e:
+                logger.error(f"An unexpected error occurred with '{pdf_path.name}': {e}")
+                error_count += 1
 
     file_count = len(pdf_files) - error_count
     return total_pages, file_count, error_count
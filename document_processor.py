@@ -1,150 +1,264 @@
+import hashlib
+import multiprocessing
+import numpy as np
+import os
 import re
 import spacy
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any
-from pypdf import PdfReader
+from typing import Iterable, Iterator, List, Dict, Any
 import chromadb
 from tqdm import tqdm
 from config import config
 from logging_config import get_logger
-import uuid
+from pdf_utils import open_pdf, iter_text_pages
 
 logger = get_logger(__name__)
 
 
+def _segment_id(text: str, metadata: Dict[str, Any]) -> str:
+    """Deterministic segment ID from content, so reruns upsert instead of duplicating"""
+    key = f"{metadata.get('filename')}|{metadata.get('page_number')}|{metadata.get('chunk_index')}|{text}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+_WS_RE = re.compile(r'\s+')
+_SECTION_RE = re.compile(
+    r'(?m)^(?:\s*(Modul|Modulname|Inhalt|Ziele|Leistungspunkte|Dauer|Voraussetzungen|Studienleistungen|Empfohlene Literatur|Prüfungen|Lehrformen)[^:]*:)',
+    re.IGNORECASE
+)
+
+
+def _iter_pages(pdf_path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield text pages from one PDF with page number tracking"""
+    # Extraction itself can fail mid-document (malformed xref tables,
+    # AES-encrypted files), so the whole walk is guarded, not just the open
+    try:
+        reader = open_pdf(pdf_path)
+        yield from iter_text_pages(reader)
+    except Exception as e:
+        logger.error(f"Failed to read {pdf_path}: {e}")
+
+
+def _extract_pages(pdf_path: Path) -> List[Dict[str, Any]]:
+    """Extract all pages at once (top-level so it can run in a worker process)"""
+    return list(_iter_pages(pdf_path))
+
+
 class DocumentProcessor:
     def __init__(self):
         self.config = config
         self.chroma_client = chromadb.PersistentClient(
             path=self.config.get_chroma_config()['persist_directory']
         )
-        self.collection = self.chroma_client.get_or_create_collection(
-            name=self.config.get_chroma_config()['collection_name']
+        self._embedding_dtype = (
+            np.float16 if self.config.get('chroma.embedding_dtype', 'float32') == 'float16' else np.float32
         )
-        self.nlp = spacy.load(self.config.get_spacy_config()['model'])
-        logger.info(f"Using spaCy model: {self.config.get_spacy_config()['model']}")
+        self.embedding_backend = self.config.get('documents.embedding_backend', 'spacy')
+        if self.embedding_backend == 'onnx':
+            # Chroma's bundled MiniLM embedder runs through onnxruntime and
+            # embeds documents itself at insert time, so spaCy is not loaded
+            from chromadb.utils import embedding_functions
+            self.nlp = None
+            self.collection = self.chroma_client.get_or_create_collection(
+                name=self.config.get_chroma_config()['collection_name'],
+                embedding_function=embedding_functions.ONNXMiniLM_L6_V2()
+            )
+            logger.info("Using ONNX MiniLM embedding backend")
+        else:
+            self.collection = self.chroma_client.get_or_create_collection(
+                name=self.config.get_chroma_config()['collection_name']
+            )
+            # Only doc.vector is used, which comes from the static vectors table,
+            # so the expensive analysis components can be disabled
+            self.nlp = spacy.load(
+                self.config.get_spacy_config()['model'],
+                disable=["tagger", "parser", "ner", "attribute_ruler", "lemmatizer", "morphologizer"]
+            )
+            logger.info(f"Using spaCy model: {self.config.get_spacy_config()['model']}")
 
     def clean_text(self, text: str) -> str:
         """Remove unnecessary whitespace and broken line breaks"""
-        text = re.sub(r'\s+', ' ', text)
-        text = text.replace('\n', ' ')
-        return text.strip()
+        # \s+ already covers newlines, one substitution pass is enough
+        return _WS_RE.sub(' ', text).strip()
 
-    def extract_text_from_pdf_with_pages(self, pdf_path: Path) -> List[Dict[str, Any]]:
-        """Extract text from PDF with page number tracking"""
-        try:
-            reader = PdfReader(pdf_path)
-            pages_data = []
-            for page_num, page in enumerate(reader.pages, start=1):
-                text = page.extract_text()
-                if text:
-                    pages_data.append({
-                        'text': text,
-                        'page_number': page_num
-                    })
-            return pages_data
-        except Exception as e:
-            logger.error(f"Failed to read {pdf_path}: {e}")
-            return []
+    def extract_text_from_pdf_with_pages(self, pdf_path: Path) -> Iterator[Dict[str, Any]]:
+        """Extract text from PDF with page number tracking, one page at a time"""
+        return _iter_pages(pdf_path)
 
-    def segment_document(self, pages_data: List[Dict], filename: str, pdf_path: Path) -> List[Dict[str, Any]]:
-        """Segment document into logical parts with page tracking"""
+    def segment_document(self, pages_data: Iterable[Dict], filename: str, pdf_path: Path) -> Iterator[Dict[str, Any]]:
+        """Segment document into logical parts with page tracking, yielded lazily"""
         doc_config = self.config.get_document_config()
         chunk_size = doc_config['processing']['chunk_size']
         overlap = doc_config['processing']['chunk_overlap']
+        min_chunk_size = doc_config['processing'].get('min_chunk_size', 30)
+        step = chunk_size - overlap
+        pdf_path_str = str(pdf_path.absolute())
+        chunk_counter = 0
 
-        section_pattern = re.compile(
-            r'(?m)^(?:\s*(Modul|Modulname|Inhalt|Ziele|Leistungspunkte|Dauer|Voraussetzungen|Studienleistungen|Empfohlene Literatur|Prüfungen|Lehrformen)[^:]*:)',
-            re.IGNORECASE
-        )
-
-        all_segments = []
-        
         for page_data in pages_data:
             text = page_data['text']
             page_num = page_data['page_number']
             cleaned = self.clean_text(text)
-            
-            pieces = re.split(section_pattern, cleaned)
-            
-            if len(pieces) < 2:
+
+            matches = list(_SECTION_RE.finditer(cleaned))
+
+            page_segments = []
+            if not matches:
                 # No section headers found, treat as single segment
                 if len(cleaned.split()) > 10:
-                    all_segments.append({
-                        "title": "Gesamtdokument",
-                        "text": cleaned,
-                        "page_number": page_num
-                    })
+                    page_segments.append(("Gesamtdokument", cleaned))
             else:
+                # One pass over the header spans; the body of each section is
+                # the slice between a header's end and the next header's start
+                # The page was already whitespace-normalized above, so section
+                # bodies sliced out of it only need their edges stripped
                 current_title = ""
-                for part in pieces:
-                    if re.match(section_pattern, part):
-                        current_title = part.strip()
-                    else:
-                        cleaned_part = self.clean_text(part)
-                        if len(cleaned_part.split()) > 10:
-                            all_segments.append({
-                                "title": current_title or "Abschnitt",
-                                "text": cleaned_part,
-                                "page_number": page_num
-                            })
-
-        # Split long sections into smaller chunks with indexing
-        final_segments = []
-        chunk_counter = 0
-        
-        for seg in all_segments:
-            words = seg["text"].split()
-            for i in range(0, len(words), chunk_size - overlap):
-                chunk = " ".join(words[i:i + chunk_size])
-                chunk_counter += 1
-                final_segments.append({
-                    "text": chunk,
-                    "metadata": {
-                        "title": seg["title"],
-                        "filename": filename,
-                        "page_number": seg["page_number"],
-                        "chunk_index": chunk_counter,
-                        "pdf_path": str(pdf_path.absolute())
+                prev_end = 0
+                for match in matches:
+                    body = cleaned[prev_end:match.start()].strip()
+                    if len(body.split()) > 10:
+                        page_segments.append((current_title or "Abschnitt", body))
+                    current_title = match.group().strip()
+                    prev_end = match.end()
+                body = cleaned[prev_end:].strip()
+                if len(body.split()) > 10:
+                    page_segments.append((current_title or "Abschnitt", body))
+
+            # Split long sections into smaller chunks with indexing
+            for title, seg_text in page_segments:
+                words = seg_text.split()
+                for i in range(0, len(words), step):
+                    window = words[i:i + chunk_size]
+                    # Tail windows with only a few words left carry no usable
+                    # context and would still be embedded and stored
+                    if i > 0 and len(window) < min_chunk_size:
+                        continue
+                    chunk = " ".join(window)
+                    chunk_counter += 1
+                    yield {
+                        "text": chunk,
+                        "metadata": {
+                            "title": title,
+                            "filename": filename,
+                            "page_number": page_num,
+                            "chunk_index": chunk_counter,
+                            "pdf_path": pdf_path_str
+                        }
                     }
-                })
-        return final_segments
-
-    def vectorize_and_store(self, segments: List[Dict[str, Any]]):
-        """Embed document text using spaCy and store in ChromaDB"""
-        for segment in tqdm(segments, desc="Vectorizing segments"):
-            try:
-                doc = self.nlp(segment['text'])
-                if doc.vector_norm > 0:
-                    unique_id = str(uuid.uuid4())
-                    self.collection.add(
-                        ids=[unique_id],
-                        documents=[segment['text']],
-                        embeddings=[doc.vector.tolist()],
-                        metadatas=[segment['metadata']]
-                    )
-            except Exception as e:
-                logger.error(f"Vectorizing segment failed: {e}")
+
+    def vectorize_and_store(self, segments: Iterable[Dict[str, Any]], batch_size: int = 256) -> int:
+        """Embed document text using spaCy and store in ChromaDB in batches.
+
+        Consumes segments lazily so extraction, embedding and storage overlap
+        without materializing a whole document. Returns the number of stored segments.
+        """
+        if self.embedding_backend == 'onnx':
+            return self._store_with_collection_embedder(segments, batch_size)
+        stored = 0
+        try:
+            buffer = []
+            for segment in segments:
+                buffer.append(segment)
+                if len(buffer) >= batch_size:
+                    stored += self._embed_and_upsert(buffer)
+                    buffer = []
+            if buffer:
+                stored += self._embed_and_upsert(buffer)
+        except Exception as e:
+            logger.error(f"Vectorizing segments failed: {e}")
+        return stored
+
+    def _has_known_word(self, text: str) -> bool:
+        """Check for at least one in-vocabulary token using only the tokenizer.
+
+        Garbled or punctuation-only segments would otherwise go through the
+        full pipeline just for vector_norm to come out as zero.
+        """
+        return any(token.has_vector for token in self.nlp.tokenizer(text))
+
+    def _embed_and_upsert(self, buffer: List[Dict[str, Any]]) -> int:
+        """Embed one buffered batch of segments and upsert it into ChromaDB"""
+        buffer = [segment for segment in buffer if self._has_known_word(segment['text'])]
+        # Grouping similar-length texts into the same pipe batch keeps the
+        # per-batch work even; insertion order does not matter to Chroma
+        buffer.sort(key=lambda segment: len(segment['text']))
+        ids, documents, embeddings, metadatas = [], [], [], []
+        pairs = ((segment['text'], segment['metadata']) for segment in buffer)
+        for doc, metadata in self.nlp.pipe(pairs, batch_size=64, as_tuples=True):
+            if doc.vector_norm > 0:
+                ids.append(_segment_id(doc.text, metadata))
+                documents.append(doc.text)
+                embeddings.append(doc.vector)
+                metadatas.append(metadata)
+        if ids:
+            self.collection.upsert(
+                ids=ids,
+                documents=documents,
+                embeddings=np.asarray(embeddings, dtype=self._embedding_dtype),
+                metadatas=metadatas
+            )
+        return len(ids)
+
+    def _store_with_collection_embedder(self, segments: Iterable[Dict[str, Any]], batch_size: int) -> int:
+        """Store segments without precomputed embeddings; the collection embeds them"""
+        stored = 0
+        try:
+            ids, documents, metadatas = [], [], []
+            for segment in segments:
+                ids.append(_segment_id(segment['text'], segment['metadata']))
+                documents.append(segment['text'])
+                metadatas.append(segment['metadata'])
+                if len(ids) >= batch_size:
+                    self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+                    stored += len(ids)
+                    ids, documents, metadatas = [], [], []
+            if ids:
+                self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+                stored += len(ids)
+        except Exception as e:
+            logger.error(f"Vectorizing segments failed: {e}")
+        return stored
 
     def process_pdf(self, pdf_path: Path):
         """Full processing pipeline for one PDF"""
         logger.info(f"Processing: {pdf_path}")
         pages_data = self.extract_text_from_pdf_with_pages(pdf_path)
-        if not pages_data:
-            logger.warning(f"No text extracted from {pdf_path}")
-            return 0
-        
         segments = self.segment_document(pages_data, pdf_path.name, pdf_path)
-        self.vectorize_and_store(segments)
-        logger.info(f"Processed {len(segments)} segments from {pdf_path}")
-        return len(segments)
+        stored = self.vectorize_and_store(segments)
+        if stored == 0:
+            logger.warning(f"No segments stored from {pdf_path}")
+            return 0
+        logger.info(f"Processed {stored} segments from {pdf_path}")
+        return stored
 
     def process_directory(self, directory: Path):
-        """Process all PDFs within a directory"""
+        """Process all PDFs within a directory, extracting text in parallel"""
         pdf_files = list(directory.rglob("*.pdf"))
         total_segments = 0
-        for pdf_path in tqdm(pdf_files, desc="Processing PDFs"):
-            total_segments += self.process_pdf(pdf_path)
+        max_workers = min(os.cpu_count() or 1, 6)
+        # PDF text extraction is CPU-bound, so spread it over worker processes.
+        # Segmentation, embedding and ChromaDB writes stay in the main process
+        # so the spaCy model and the ChromaDB client are never forked.
+        # Forked workers share the parent's pages copy-on-write instead of
+        # re-importing the world; spawn is the fallback where fork is missing.
+        try:
+            mp_context = multiprocessing.get_context('fork')
+        except ValueError:
+            mp_context = None
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+            futures = {executor.submit(_extract_pages, pdf_path): pdf_path for pdf_path in pdf_files}
+            for future in tqdm(as_completed(futures), total=len(pdf_files), desc="Processing PDFs"):
+                pdf_path = futures[future]
+                try:
+                    pages_data = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to process {pdf_path}: {e}")
+                    continue
+                if not pages_data:
+                    logger.warning(f"No text extracted from {pdf_path}")
+                    continue
+                segments = self.segment_document(pages_data, pdf_path.name, pdf_path)
+                total_segments += self.vectorize_and_store(segments)
         logger.info(f"Total processed segments: {total_segments}")
         return total_segments
 
@@ -0,0 +1,28 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from pypdf import PdfReader
+
+
+def open_pdf(pdf_path: Path) -> PdfReader:
+    """Open a PDF once so page counting and text extraction share one parse.
+
+    Parsing the xref table and object graph is the expensive part of
+    opening a PDF; callers that need both the page count and the page
+    text should open the reader here and pass it around instead of
+    constructing a second PdfReader for the same file.
+    """
+    # strict=False downgrades recoverable structure problems to warnings
+    # instead of raising, and skips the pedantic validation passes
+    return PdfReader(pdf_path, strict=False)
+
+
+def iter_text_pages(reader: PdfReader) -> Iterator[Dict[str, Any]]:
+    """Yield non-empty text pages from an already-opened reader"""
+    for page_num, page in enumerate(reader.pages, start=1):
+        text = page.extract_text()
+        if text:
+            yield {
+                'text': text,
+                'page_number': page_num
+            }
@@ -1,6 +1,13 @@
+import asyncio
 import chromadb
+import functools
+import httpx
+import json
+import numpy as np
 import spacy
-from typing import List, Dict, Any, Tuple
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import requests
 
@@ -10,18 +17,91 @@ from logging_config import get_logger
 logger = get_logger(__name__)
 
 class RAGEngine:
+    _PROMPT_TMPL = """Du bist ein hilfreicher Assistent für Studierende der Universität Leipzig.
+Beantworte die folgende Frage basierend ausschließlich auf dem gegebenen Kontext aus den Universitätsdokumenten.
+
+WICHTIGE REGELN:
+1. Beantworte nur Fragen, die sich aus dem Kontext beantworten lassen
+2. Wenn der Kontext keine ausreichenden Informationen enthält, sage ehrlich "Ich kann diese Frage nicht basierend auf den verfügbaren Dokumenten beantworten"
+3. Gib am Ende deiner Antwort die verwendeten Quellen an
+4. Antworte auf Deutsch und sei präzise
+
+KONTEXT:
+{context}
+
+FRAGE: {query}
+
+ANTWORT:"""
+
     def __init__(self):
         self.config = config
+        # Must match the backend documents were ingested with; a spaCy
+        # query vector against a MiniLM collection fails on dimensions
+        self.embedding_backend = self.config.get('documents.embedding_backend', 'spacy')
         self.nlp = self._load_spacy_model()
         self.chroma_client = self._initialize_chroma()
         self.collection = self._get_collection()
         self.ollama_config = self.config.get_ollama_config()
+        # Repeated and near-duplicate questions skip retrieval and generation;
+        # entries hold the unit query vector alongside the finished result
+        # Bound per instance so the cache dies with the engine instead of
+        # pinning self in a class-level lru_cache
+        self._embed = functools.lru_cache(maxsize=1024)(self._embed_uncached)
+        self._embedding_dtype = (
+            np.float16 if self.config.get('chroma.embedding_dtype', 'float32') == 'float16' else np.float32
+        )
+        self._answer_cache: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self._cache_max_entries = self.config.get('query_cache.max_entries', 512)
+        self._cache_similarity = self.config.get('query_cache.similarity_threshold', 0.97)
+        self._status_cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+        self.session = self._build_session()
+        # Async client for concurrent generations; Ollama serves them in
+        # parallel up to OLLAMA_NUM_PARALLEL. Timeouts come from the same
+        # config values the sync path reads via _ollama_timeout().
+        connect_timeout, read_timeout = self._ollama_timeout()
+        self.aclient = httpx.AsyncClient(
+            base_url=self.ollama_config['base_url'],
+            timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout, write=60, pool=None),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        )
+
+    def _build_session(self) -> requests.Session:
+        """Pooled HTTP session so Ollama requests reuse one keep-alive connection"""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'Connection': 'keep-alive',
+            'Accept-Encoding': 'gzip, deflate',
+        })
+        return session
+
+    def close(self) -> None:
+        self.session.close()
+        try:
+            asyncio.run(self.aclient.aclose())
+        except RuntimeError:
+            # Already inside a running loop; the caller should await aclose()
+            pass
+
+    def __del__(self):
+        # Best-effort cleanup of both clients when close() was never called
+        try:
+            self.close()
+        except Exception:
+            pass
 
     def _load_spacy_model(self) -> spacy.Language:
         spacy_config = self.config.get_spacy_config()
         model_name = spacy_config['model']
         try:
-            nlp = spacy.load(model_name)
+            # Queries only need doc.vector, which comes from the static
+            # vectors table, so skip the analysis components entirely
+            nlp = spacy.load(
+                model_name,
+                disable=['tagger', 'parser', 'ner', 'attribute_ruler', 'lemmatizer', 'morphologizer']
+            )
             logger.info(f"Loaded spaCy model: {model_name}")
             return nlp
         except OSError:
@@ -41,7 +121,16 @@ class RAGEngine:
     def _get_collection(self) -> chromadb.Collection:
         chroma_config = self.config.get_chroma_config()
         try:
-            collection = self.chroma_client.get_collection(name=chroma_config['collection_name'])
+            if self.embedding_backend == 'onnx':
+                # Same embedder the processor ingested with; queries go in
+                # as text and the collection embeds them itself
+                from chromadb.utils import embedding_functions
+                collection = self.chroma_client.get_collection(
+                    name=chroma_config['collection_name'],
+                    embedding_function=embedding_functions.ONNXMiniLM_L6_V2()
+                )
+            else:
+                collection = self.chroma_client.get_collection(name=chroma_config['collection_name'])
             doc_count = collection.count()
             logger.info(f"Connected to collection '{chroma_config['collection_name']}' with {doc_count} documents")
             if doc_count == 0:
@@ -51,43 +140,159 @@ class RAGEngine:
             logger.error(f"Error accessing collection '{chroma_config['collection_name']}': {e}")
             raise
 
-    def _query_ollama(self, prompt: str) -> str:
-        url = f"{self.ollama_config['base_url']}/api/generate"
-        payload = {
+    def _ollama_payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        return {
             "model": self.ollama_config['model'],
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": self.ollama_config.get('keep_alive', '5m'),
             "options": {
                 "temperature": self.ollama_config.get('temperature', 0.1),
                 "num_predict": self.ollama_config.get('max_tokens', 2048),
             }
         }
+
+    def _ollama_timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeouts; CPU-only generations can run for minutes"""
+        return (
+            self.ollama_config.get('connect_timeout', 10),
+            self.ollama_config.get('read_timeout', 600),
+        )
+
+    def _query_ollama(self, prompt: str) -> Tuple[str, bool]:
+        """Returns (answer, success); error messages never count as answers"""
+        url = f"{self.ollama_config['base_url']}/api/generate"
+        payload = self._ollama_payload(prompt)
         try:
-            response = requests.post(url, json=payload, timeout=60)
+            response = self.session.post(url, json=payload, timeout=self._ollama_timeout())
             response.raise_for_status()
             result = response.json()
-            return result.get('response', 'Keine Antwort erhalten.')
+            return result.get('response', 'Keine Antwort erhalten.'), True
         except requests.exceptions.ConnectionError:
             logger.error("Cannot connect to Ollama. Make sure Ollama is running.")
-            return "Fehler: Verbindung zu Ollama fehlgeschlagen. Stellen Sie sicher, dass Ollama läuft."
+            return "Fehler: Verbindung zu Ollama fehlgeschlagen. Stellen Sie sicher, dass Ollama läuft.", False
+        except requests.exceptions.Timeout:
+            logger.error("Ollama request timed out")
+            return "Fehler: Zeitüberschreitung bei der Anfrage an Ollama.", False
+        except Exception as e:
+            logger.error(f"Error querying Ollama: {e}")
+            return f"Fehler bei der Anfrage: {str(e)}", False
+
+    def _stream_ollama(self, prompt: str) -> Iterator[str]:
+        """Yield answer fragments as Ollama produces them"""
+        url = f"{self.ollama_config['base_url']}/api/generate"
+        payload = self._ollama_payload(prompt, stream=True)
+        try:
+            with self.session.post(url, json=payload, stream=True, timeout=self._ollama_timeout()) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('response'):
+                        yield chunk['response']
+                    if chunk.get('done'):
+                        break
+        except requests.exceptions.ConnectionError:
+            logger.error("Cannot connect to Ollama. Make sure Ollama is running.")
+            yield "Fehler: Verbindung zu Ollama fehlgeschlagen. Stellen Sie sicher, dass Ollama läuft."
         except requests.exceptions.Timeout:
+            logger.error("Ollama request timed out")
+            yield "Fehler: Zeitüberschreitung bei der Anfrage an Ollama."
+        except Exception as e:
+            logger.error(f"Error querying Ollama: {e}")
+            yield f"Fehler bei der Anfrage: {str(e)}"
+
+    async def _aquery_ollama(self, prompt: str) -> str:
+        try:
+            response = await self.aclient.post('/api/generate', json=self._ollama_payload(prompt))
+            response.raise_for_status()
+            result = response.json()
+            return result.get('response', 'Keine Antwort erhalten.')
+        except httpx.ConnectError:
+            logger.error("Cannot connect to Ollama. Make sure Ollama is running.")
+            return "Fehler: Verbindung zu Ollama fehlgeschlagen. Stellen Sie sicher, dass Ollama läuft."
+        except httpx.TimeoutException:
             logger.error("Ollama request timed out")
             return "Fehler: Zeitüberschreitung bei der Anfrage an Ollama."
         except Exception as e:
             logger.error(f"Error querying Ollama: {e}")
             return f"Fehler bei der Anfrage: {str(e)}"
 
+    def _embed_uncached(self, text: str) -> Optional[np.ndarray]:
+        """Embed text via the static vectors; None when nothing is in vocabulary"""
+        # make_doc runs only the tokenizer; the vectors live in the vocab, so
+        # the text never has to pass through the pipeline at all. Empty and
+        # fully out-of-vocabulary input is rejected without computing a norm.
+        doc = self.nlp.make_doc(text)
+        if len(doc) == 0:
+            return None
+        vectors = [token.vector for token in doc if token.has_vector]
+        if not vectors:
+            return None
+        # Same value as Doc.vector: token vector sum (OOV tokens contribute
+        # zeros) divided by the total token count
+        return np.sum(vectors, axis=0, dtype=np.float32) / len(doc)
+
+    def _normalize_query(self, query_text: str) -> str:
+        return ' '.join(query_text.lower().split())
+
+    def _cache_lookup(self, norm_query: str, n_results: int) -> Optional[Dict[str, Any]]:
+        """Return a cached answer for an exact or semantically similar query.
+
+        Keys include n_results: the same question answered over a different
+        context size is a different result (sources, context_count).
+        """
+        key = (norm_query, n_results)
+        if key in self._answer_cache:
+            self._answer_cache.move_to_end(key)
+            logger.info("Answer cache hit (exact)")
+            return self._answer_cache[key]['result']
+        candidates = [cached_key for cached_key in self._answer_cache if cached_key[1] == n_results]
+        if not candidates:
+            return None
+        vec = self._embed(norm_query)
+        if vec is None:
+            return None
+        query_vec = vec / np.linalg.norm(vec)
+        cached_vecs = np.stack([self._answer_cache[cached_key]['vector'] for cached_key in candidates])
+        sims = cached_vecs @ query_vec
+        best = int(np.argmax(sims))
+        if sims[best] >= self._cache_similarity:
+            self._answer_cache.move_to_end(candidates[best])
+            logger.info(f"Answer cache hit (similarity {sims[best]:.3f})")
+            return self._answer_cache[candidates[best]]['result']
+        return None
+
+    def _cache_store(self, norm_query: str, n_results: int, result: Dict[str, Any]) -> None:
+        vec = self._embed(norm_query)
+        if vec is None:
+            return
+        self._answer_cache[(norm_query, n_results)] = {
+            'vector': vec / np.linalg.norm(vec),
+            'result': result
+        }
+        while len(self._answer_cache) > self._cache_max_entries:
+            self._answer_cache.popitem(last=False)
+
     def retrieve_documents(self, query_text: str, n_results: int = 5) -> Tuple[List[str], List[Dict]]:
         try:
-            query_doc = self.nlp(query_text)
-            if query_doc.vector_norm == 0:
-                logger.warning(f"Query has no vector representation: {query_text}")
-                return [], []
-            query_embedding = query_doc.vector.tolist()
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-            )
+            if self.embedding_backend == 'onnx':
+                results = self.collection.query(
+                    query_texts=[query_text],
+                    n_results=n_results,
+                )
+            else:
+                query_embedding = self._embed(query_text)
+                if query_embedding is None:
+                    logger.warning(f"Query has no vector representation: {query_text}")
+                    return [], []
+                # Chroma accepts float32 numpy arrays directly; converting to a
+                # Python list would just box every component for no reason
+                results = self.collection.query(
+                    query_embeddings=np.ascontiguousarray(query_embedding, dtype=self._embedding_dtype)[None, :],
+                    n_results=n_results,
+                )
             if not results['documents'] or not results['documents'][0]:
                 logger.info(f"No documents found for query: {query_text}")
                 return [], []
@@ -98,62 +303,47 @@ class RAGEngine:
             logger.error(f"Error retrieving documents: {e}")
             return [], []
 
-    def generate_prompt(self, query_text: str, context_docs: List[str], metadatas: List[Dict]) -> str:
-        context_parts = []
-        for i, (doc, meta) in enumerate(zip(context_docs, metadatas), 1):
-            filename = meta.get('filename', 'Unbekanntes Dokument')
-            title = meta.get('title', 'Unbekannter Abschnitt')
-            context_parts.append(f"[Quelle {i}: {filename} - {title}]\n{doc}\n")
-        context = "\n".join(context_parts)
-        prompt = f"""Du bist ein hilfreicher Assistent für Studierende der Universität Leipzig. 
-Beantworte die folgende Frage basierend ausschließlich auf dem gegebenen Kontext aus den Universitätsdokumenten.
-
-WICHTIGE REGELN:
-1. Beantworte nur Fragen, die sich aus dem Kontext beantworten lassen
-2. Wenn der Kontext keine ausreichenden Informationen enthält, sage ehrlich "Ich kann diese Frage nicht basierend auf den verfügbaren Dokumenten beantworten"
-3. Gib am Ende deiner Antwort die verwendeten Quellen an
-4. Antworte auf Deutsch und sei präzise
-
-KONTEXT:
-{context}
-
-FRAGE: {query_text}
-
-ANTWORT:"""
-        return prompt
+    def retrieve_documents_batch(self, queries: List[str], n_results: int = 5) -> List[Tuple[List[str], List[Dict]]]:
+        """Embed several queries at once and resolve them in one Chroma round trip"""
+        batch_results: List[Tuple[List[str], List[Dict]]] = [([], []) for _ in queries]
+        try:
+            if self.embedding_backend == 'onnx':
+                results = self.collection.query(query_texts=queries, n_results=n_results)
+                return [
+                    (result_docs, result_metas)
+                    for result_docs, result_metas in zip(results['documents'], results['metadatas'])
+                ]
+            docs = list(self.nlp.pipe(queries, batch_size=32))
+            # vector.any() answers "is this a usable embedding" without the
+            # square/sum/sqrt pass that vector_norm would run per query
+            valid = [(i, doc.vector) for i, doc in enumerate(docs) if doc.vector.any()]
+            if not valid:
+                logger.warning("No query in batch has a vector representation")
+                return batch_results
+            embeddings = np.vstack([vector for _, vector in valid]).astype(self._embedding_dtype, copy=False)
+            results = self.collection.query(
+                query_embeddings=embeddings,
+                n_results=n_results,
+            )
+            for (index, _), result_docs, result_metas in zip(valid, results['documents'], results['metadatas']):
+                batch_results[index] = (result_docs, result_metas)
+        except Exception as e:
+            logger.error(f"Error retrieving documents for batch: {e}")
+        return batch_results
 
-    """
-    #! BAD
-    def process_query(self, query_text: str, n_results: int = 5) -> Dict[str, Any]:
-        logger.info(f"Processing query: {query_text}")
-        context_docs, metadatas = self.retrieve_documents(query_text, n_results)
-        if not context_docs:
-            return {
-                'answer': "Entschuldigung, ich konnte keine relevanten Dokumente zu Ihrer Frage finden. Bitte versuchen Sie eine andere Formulierung oder ein anderes Thema.",
-                'sources': [],
-                'query': query_text,
-                'success': False
-            }
-        prompt = self.generate_prompt(query_text, context_docs, metadatas)
-        answer = self._query_ollama(prompt)
-        sources = []
-        for meta in metadatas:
-            source_info = {
-                'filename': meta.get('filename', 'Unbekannt'),
-                'title': meta.get('title', 'Unbekannt'),
-                'path': meta.get('relative_path', 'Unbekannt')
-            }
-            if source_info not in sources:
-                sources.append(source_info)
-        return {
-            'answer': answer,
-            'sources': sources,
-            'query': query_text,
-            'success': True,
-            'context_count': len(context_docs)
-        } """
+    def generate_prompt(self, query_text: str, context_docs: List[str], metadatas: List[Dict]) -> str:
+        context = "\n".join(
+            f"[Quelle {i}: {meta.get('filename', 'Unbekanntes Dokument')} - {meta.get('title', 'Unbekannter Abschnitt')}]\n{doc}\n"
+            for i, (doc, meta) in enumerate(zip(context_docs, metadatas), 1)
+        )
+        return self._PROMPT_TMPL.format(context=context, query=query_text)
 
-    def check_system_status(self) -> Dict[str, Any]:
+    def check_system_status(self, ttl: float = 10.0) -> Dict[str, Any]:
+        # Streamlit calls this on every rerun; a short TTL keeps the sidebar
+        # from probing Chroma, spaCy and Ollama dozens of times per minute
+        checked_at, cached = self._status_cache
+        if cached is not None and time.monotonic() - checked_at < ttl:
+            return cached
         status = {'chroma_db': False, 'spacy_model': False, 'ollama': False, 'document_count': 0}
         try:
             count = self.collection.count()
@@ -162,19 +352,41 @@ ANTWORT:"""
         except Exception as e:
             logger.error(f"ChromaDB check failed: {e}")
         try:
-            test_doc = self.nlp("Test")
-            status['spacy_model'] = test_doc.vector_norm > 0
+            status['spacy_model'] = self._embed("Test") is not None
         except Exception as e:
             logger.error(f"spaCy check failed: {e}")
         try:
-            response = requests.get(f"{self.ollama_config['base_url']}/api/version", timeout=5)
+            response = self.session.get(f"{self.ollama_config['base_url']}/api/version", timeout=5)
             status['ollama'] = response.status_code == 200
         except Exception as e:
             logger.error(f"Ollama check failed: {e}")
+        self._status_cache = (time.monotonic(), status)
         return status
-    
+
+    def _build_sources(self, metadatas: List[Dict]) -> List[Dict[str, Any]]:
+        """Deduplicate source entries in O(n) while preserving retrieval order"""
+        seen = set()
+        sources = []
+        for meta in metadatas:
+            key = (meta.get('filename'), meta.get('title'), meta.get('page_number'), meta.get('chunk_index'))
+            if key in seen:
+                continue
+            seen.add(key)
+            sources.append({
+                'filename': meta.get('filename', 'Unbekannt'),
+                'title': meta.get('title', 'Unbekannt'),
+                'page_number': meta.get('page_number', 'N/A'),
+                'chunk_index': meta.get('chunk_index', 'N/A'),
+                'pdf_path': meta.get('pdf_path', '')
+            })
+        return sources
+
     def process_query(self, query_text: str, n_results: int = 5) -> Dict[str, Any]:
         logger.info(f"Processing query: {query_text}")
+        norm_query = self._normalize_query(query_text)
+        cached = self._cache_lookup(norm_query, n_results)
+        if cached is not None:
+            return cached
         context_docs, metadatas = self.retrieve_documents(query_text, n_results)
         
         if not context_docs:
@@ -186,20 +398,97 @@ ANTWORT:"""
             }
         
         prompt = self.generate_prompt(query_text, context_docs, metadatas)
-        answer = self._query_ollama(prompt)
-        
-        sources = []
-        for meta in metadatas:
-            source_info = {
-                'filename': meta.get('filename', 'Unbekannt'),
-                'title': meta.get('title', 'Unbekannt'),
-                'page_number': meta.get('page_number', 'N/A'),
-                'chunk_index': meta.get('chunk_index', 'N/A'),
-                'pdf_path': meta.get('pdf_path', '')
+        answer, generated = self._query_ollama(prompt)
+        sources = self._build_sources(metadatas)
+
+        result = {
+            'answer': answer,
+            'sources': sources,
+            'query': query_text,
+            'success': generated,
+            'context_count': len(context_docs)
+        }
+        # Only real answers go into the cache; a transient Ollama outage
+        # must not keep answering retries with the cached error message
+        if generated:
+            self._cache_store(norm_query, n_results, result)
+        return result
+
+    def retrieve(self, query_text: str, n_results: int = 5) -> Tuple[List[str], List[Dict], List[Dict]]:
+        """Retrieval phase only: context documents, their metadata and the
+        deduplicated source list, without touching Ollama.
+
+        Callers can show the sources immediately and stream the answer
+        afterwards via stream_answer. For a cached question the sources come
+        from the cache and ChromaDB is not queried; stream_answer then
+        replays the cached answer.
+        """
+        cached = self._cache_lookup(self._normalize_query(query_text), n_results)
+        if cached is not None:
+            return [], [], cached['sources']
+        context_docs, metadatas = self.retrieve_documents(query_text, n_results)
+        return context_docs, metadatas, self._build_sources(metadatas)
+
+    def stream_answer(self, query_text: str, context_docs: List[str], metadatas: List[Dict],
+                      n_results: int = 5) -> Iterator[str]:
+        """Generation phase: stream answer fragments for an earlier retrieve call"""
+        norm_query = self._normalize_query(query_text)
+        cached = self._cache_lookup(norm_query, n_results)
+        if cached is not None:
+            # Replay the cached answer as a single fragment
+            yield cached['answer']
+            return
+        if not context_docs:
+            yield "Entschuldigung, ich konnte keine relevanten Dokumente zu Ihrer Frage finden."
+            return
+        prompt = self.generate_prompt(query_text, context_docs, metadatas)
+        fragments = []
+        generated = True
+        for fragment in self._stream_ollama(prompt):
+            # _stream_ollama reports failures as "Fehler: ..." fragments;
+            # those must not end up cached, mirroring process_query
+            if fragment.startswith("Fehler"):
+                generated = False
+            fragments.append(fragment)
+            yield fragment
+        if generated and fragments:
+            self._cache_store(norm_query, n_results, {
+                'answer': "".join(fragments),
+                'sources': self._build_sources(metadatas),
+                'query': query_text,
+                'success': True,
+                'context_count': len(context_docs)
+            })
+
+    def process_query_stream(self, query_text: str, n_results: int = 5) -> Iterator[str]:
+        """Stream the answer for a query; fragments arrive as they are generated"""
+        logger.info(f"Processing query (streaming): {query_text}")
+        cached = self._cache_lookup(self._normalize_query(query_text), n_results)
+        if cached is not None:
+            yield cached['answer']
+            return
+        context_docs, metadatas = self.retrieve_documents(query_text, n_results)
+        yield from self.stream_answer(query_text, context_docs, metadatas, n_results)
+
+    async def aprocess_query(self, query_text: str, n_results: int = 5) -> Dict[str, Any]:
+        """Async variant of process_query; only the Ollama round trip awaits"""
+        logger.info(f"Processing query: {query_text}")
+        context_docs, metadatas = self.retrieve_documents(query_text, n_results)
+        return await self._agenerate_result(query_text, context_docs, metadatas)
+
+    async def _agenerate_result(self, query_text: str, context_docs: List[str], metadatas: List[Dict]) -> Dict[str, Any]:
+        if not context_docs:
+            return {
+                'answer': "Entschuldigung, ich konnte keine relevanten Dokumente zu Ihrer Frage finden.",
+                'sources': [],
+                'query': query_text,
+                'success': False
             }
-            if source_info not in sources:
-                sources.append(source_info)
-        
+
+        prompt = self.generate_prompt(query_text, context_docs, metadatas)
+        answer = await self._aquery_ollama(prompt)
+        sources = self._build_sources(metadatas)
+
         return {
             'answer': answer,
             'sources': sources,
@@ -208,6 +497,14 @@ ANTWORT:"""
             'context_count': len(context_docs)
         }
 
+    async def abatch_process(self, queries: List[str], n_results: int = 5) -> List[Dict[str, Any]]:
+        """Answer several queries concurrently; generations overlap on the Ollama side"""
+        retrievals = self.retrieve_documents_batch(queries, n_results)
+        return await asyncio.gather(*(
+            self._agenerate_result(query, context_docs, metadatas)
+            for query, (context_docs, metadatas) in zip(queries, retrievals)
+        ))
+
 
 def create_rag_engine() -> RAGEngine:
     return RAGEngine()
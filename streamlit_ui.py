@@ -7,18 +7,26 @@ from config import config
 from rag_engine import create_rag_engine
 from logging_config import setup_logging, get_logger
 
-setup_logging(
-    log_level=config.get('logging.level', 'INFO'),
-    log_file=config.get('logging.file')
-)
-logger = get_logger(__name__)
-
-st.set_page_config(
-    page_title=config.get('app.name', 'RAG Chat'),
-    page_icon="🎓",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+@st.cache_resource
+def _bootstrap():
+    """One-time setup; reruns reuse the logger and resolved page settings"""
+    setup_logging(
+        log_level=config.get('logging.level', 'INFO'),
+        log_file=config.get('logging.file')
+    )
+    return get_logger(__name__), {
+        'page_title': config.get('app.name', 'RAG Chat'),
+        'page_icon': "🎓",
+        'layout': "wide",
+        'initial_sidebar_state': "expanded"
+    }
+
+
+logger, _page_settings = _bootstrap()
+
+# set_page_config itself must run on every rerun, but the config lookups
+# behind its arguments are cached above
+st.set_page_config(**_page_settings)
 
 @st.cache_resource
 def init_rag_engine():
@@ -37,39 +45,35 @@ def create_pdf_link(pdf_path: str, page_number: int) -> str:
     return "#"
 
 
+def display_sources(sources: List[Dict]):
+    with st.expander(f"Verwendete Quellen ({len(sources)})"):
+        for i, source in enumerate(sources, 1):
+            filename = source.get('filename', 'Unbekannt')
+            title = source.get('title', 'Unbekannt')
+            page = source.get('page_number', 'N/A')
+            #chunk = source.get('chunk_index', 'N/A')
+            pdf_path = source.get('pdf_path', '')
+
+            pdf_link = create_pdf_link(pdf_path, page if isinstance(page, int) else 1)
+
+            st.markdown(f'''
+                **Quelle {i}:**  
+                **Dokument:** {filename}  
+                **Abschnitt:** {title}  
+                **Seite:** {page}  
+                [PDF öffnen]({pdf_link})
+            ''')
+            st.markdown("---")
+
+
 def display_chat_message(role: str, content: str, sources: List[Dict] = None):
-    if role == "user":
-        st.markdown(f'''
-            <div style="background-color: #000000; padding: 15px; border-radius: 10px; margin: 10px 0;">
-                <strong>Sie:</strong><br>{content}
-            </div>
-        ''', unsafe_allow_html=True)
-    else:
-        st.markdown(f'''
-            <div style="background-color: #000000; padding: 15px; border-radius: 10px; margin: 10px 0;">
-                <strong>Assistent:</strong><br>{content}
-            </div>
-        ''', unsafe_allow_html=True)
-        
+    # Native chat bubbles take part in Streamlit's element diffing, unlike
+    # raw HTML markdown which is re-rendered wholesale on every rerun
+    with st.chat_message(role):
+        st.write(content)
+
         if sources:
-            with st.expander(f"Verwendete Quellen ({len(sources)})"):
-                for i, source in enumerate(sources, 1):
-                    filename = source.get('filename', 'Unbekannt')
-                    title = source.get('title', 'Unbekannt')
-                    page = source.get('page_number', 'N/A')
-                    #chunk = source.get('chunk_index', 'N/A')
-                    pdf_path = source.get('pdf_path', '')
-                    
-                    pdf_link = create_pdf_link(pdf_path, page if isinstance(page, int) else 1)
-                    
-                    st.markdown(f'''
-                        **Quelle {i}:**  
-                        **Dokument:** {filename}  
-                        **Abschnitt:** {title}  
-                        **Seite:** {page}  
-                        [PDF öffnen]({pdf_link})
-                    ''')
-                    st.markdown("---")
+            display_sources(sources)
 
 
 def main():
@@ -98,32 +102,44 @@ def main():
         st.session_state.messages = []
     
     # Display chat history
-    for message in st.session_state.messages:
-        display_chat_message(
-            message["role"],
-            message["content"],
-            message.get("sources")
-        )
-    
+    chat_container = st.container()
+    with chat_container:
+        for message in st.session_state.messages:
+            display_chat_message(
+                message["role"],
+                message["content"],
+                message.get("sources")
+            )
+
     # User input
     if prompt := st.chat_input("Ihre Frage..."):
         # Add user message
         st.session_state.messages.append({"role": "user", "content": prompt})
-        display_chat_message("user", prompt)
-        
-        # Get response
-        with st.spinner("Suche nach Antwort..."):
-            result = rag_engine.process_query(prompt)
-        
+        with chat_container:
+            display_chat_message("user", prompt)
+
+        # Retrieval is fast, so the sources appear right away; the answer
+        # then streams token by token instead of arriving as one block
+        with st.spinner("Suche nach Dokumenten..."):
+            context_docs, metadatas, sources = rag_engine.retrieve(prompt)
+
+        with chat_container:
+            with st.chat_message("assistant"):
+                if sources:
+                    display_sources(sources)
+                answer = st.write_stream(
+                    rag_engine.stream_answer(prompt, context_docs, metadatas)
+                )
+
         # Add assistant response
         st.session_state.messages.append({
             "role": "assistant",
-            "content": result['answer'],
-            "sources": result.get('sources', [])
+            "content": answer,
+            "sources": sources
         })
-        display_chat_message("assistant", result['answer'], result.get('sources'))
-        
-        st.rerun()
+
+        # No st.rerun() here: submitting the chat input already triggered this
+        # run, and rerunning again would replay the whole history a second time
 
 
 if __name__ == "__main__":
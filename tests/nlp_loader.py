@@ -0,0 +1,14 @@
+import functools
+import spacy
+
+@functools.lru_cache(maxsize=1)
+def get_nlp():
+    """Load the German model once per process and hand out that instance.
+
+    Only sentence boundaries (parser) and the static vectors are used by
+    the ingest scripts, so the analysis components stay excluded.
+    """
+    return spacy.load(
+        "de_core_news_lg",
+        exclude=["ner", "tagger", "morphologizer", "lemmatizer", "attribute_ruler"]
+    )
@@ -4,36 +4,62 @@
 #
 import requests
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 import os
 import re
+import shutil
 
-def download_pdf(url, filepath):
+def _build_session():
+    """One pooled session for the whole run; retries transient server errors"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+_session = _build_session()
+
+def download_pdf(url, filepath, session=None):
     """Download a PDF file from url to filepath"""
     try:
-        response = requests.get(url, stream=True)
+        response = (session or _session).get(url, stream=True, timeout=30)
         response.raise_for_status()
+        # Copy the response body to disk in chunks; .content would buffer
+        # the whole PDF in memory before the first byte is written.
+        # decode_content keeps transparent gzip handling on the raw stream.
+        response.raw.decode_content = True
         with open(filepath, 'wb') as f:
-            f.write(response.content)
+            shutil.copyfileobj(response.raw, f)
         return True
     except Exception as e:
         print(f"Error downloading {url}: {e}")
         return False
 
+# Compiled once; sanitize_filename runs for every folder and document title
+_BAD = re.compile(r'[<>:"/\\|?*]')
+_MULTI = re.compile(r'_+')
+
 def sanitize_filename(filename):
     """Remove invalid characters from filename"""
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    filename = re.sub(r'_+', '_', filename)
-    return filename[:240]  
+    filename = _BAD.sub('_', filename)
+    filename = _MULTI.sub('_', filename)
+    return filename[:240]
 def extract_data(url):
     document_data = []
     first_h3_text = None
 
     try:
         
-        response = requests.get(url, timeout=5)
+        response = _session.get(url, timeout=5)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(response.text, 'lxml')
         
         # extract 1. h3 Text
         first_h3_tag = soup.find('h3')
@@ -70,73 +96,75 @@ def extract_data(url):
         print(f"Fehler beim Zugriff auf die Webseite: {e}")
         return []
     
-def collect_links_recursively(url, max_depth=3, current_depth=0, visited_urls=None, parent_h3=None):
-    """
-    Recursively collect all links and maintain hierarchy using h3 tags
-    Returns: (document_urls, navigation_urls)
-    Where document_urls is a list of tuples (url, h3_path)
+def _scan_page(url):
+    """Fetch one page and classify it (runs in a worker thread)
+
+    Returns (h3_text, has_documents, child_urls)
     """
-    if visited_urls is None:
-        visited_urls = set()
-    
-    if current_depth >= max_depth or url in visited_urls:
-        return [], []
-    
-    visited_urls.add(url)
-    document_urls = []
-    navigation_urls = []
-    
     try:
-        print(f"Checking depth {current_depth}: {url}")
-        response = requests.get(url, timeout=5)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Get current h3
+        response = _session.get(url, timeout=5)
+        soup = BeautifulSoup(response.text, 'lxml')
+
         current_h3 = None
         h3_tag = soup.find('h3')
         if h3_tag:
             current_h3 = h3_tag.get_text(strip=True)
-            print(f"Found headline: {current_h3}")
-        
-        # Build path
-        h3_path = []
-        if parent_h3:
-            h3_path.extend(parent_h3)
-        if current_h3:
-            h3_path.append(current_h3)
-        
-        # Check if this page contains documents
+
+        # Pages with a document-list are leaves; everything else may link on
         if soup.find('div', id='document-list'):
-            document_urls.append((url, h3_path))
-            print(f"✓ Found documents at: {url}")
-            return document_urls, navigation_urls
-        
-        # Only look for links in categories-list
+            return current_h3, True, []
+
+        child_urls = []
         categories_list = soup.find('ul', class_='categories-list')
         if categories_list:
-            print(f"Found categories list at: {url}")
-            links = categories_list.find_all('a', href=True)
-            for link in links:
+            for link in categories_list.find_all('a', href=True):
                 full_url = urljoin(url, link['href'])
-                if ('amb.uni-leipzig.de' in full_url and 
-                    'bekanntmachungen' in full_url and 
-                    full_url not in visited_urls):
-                    
-                    doc_urls, nav_urls = collect_links_recursively(
-                        full_url, 
-                        max_depth, 
-                        current_depth + 1, 
-                        visited_urls,
-                        h3_path
-                    )
-                    document_urls.extend(doc_urls)
-                    navigation_urls.extend(nav_urls)
-        
-        return document_urls, navigation_urls
-                
+                if ('amb.uni-leipzig.de' in full_url and
+                    'bekanntmachungen' in full_url):
+                    child_urls.append(full_url)
+
+        return current_h3, False, child_urls
+
     except requests.exceptions.RequestException as e:
         print(f"Error accessing {url}: {e}")
-        return document_urls, navigation_urls
+        return None, False, []
+
+def collect_links_recursively(url, max_depth=3):
+    """
+    Collect all document pages breadth-first, fetching each depth level of
+    the category tree concurrently while keeping the h3 hierarchy intact
+    Returns: (document_urls, navigation_urls)
+    Where document_urls is a list of tuples (url, h3_path)
+    """
+    visited_urls = {url}
+    document_urls = []
+    navigation_urls = []
+    level = [(url, [])]  # (url, h3 path of the parent pages)
+    current_depth = 0
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        while level and current_depth < max_depth:
+            print(f"Checking depth {current_depth}: {len(level)} page(s)")
+            results = executor.map(lambda item: _scan_page(item[0]), level)
+
+            # Only the workers touch the network; visited_urls and the next
+            # level are updated here on the main thread between levels
+            next_level = []
+            for (page_url, parent_path), (current_h3, has_documents, child_urls) in zip(level, results):
+                h3_path = parent_path + [current_h3] if current_h3 else list(parent_path)
+                if has_documents:
+                    document_urls.append((page_url, h3_path))
+                    print(f"✓ Found documents at: {page_url}")
+                    continue
+                for child_url in child_urls:
+                    if child_url not in visited_urls:
+                        visited_urls.add(child_url)
+                        next_level.append((child_url, h3_path))
+
+            level = next_level
+            current_depth += 1
+
+    return document_urls, navigation_urls
 
 def main(start_url, max_depth=20):
     print(f"\nStarting recursive link collection from: {start_url}")
@@ -174,39 +202,46 @@ def main(start_url, max_depth=20):
     if not os.path.exists(base_dir):
         os.makedirs(base_dir)
 
-    # Function to process hierarchy
-    def process_hierarchy(current_dict, current_path):
-        download_stats = {"success": 0, "failed": 0}
-        
+    # Walk the hierarchy first and only collect (url, filepath) jobs;
+    # the actual downloads run concurrently afterwards
+    def collect_download_jobs(current_dict, current_path):
+        jobs = []
+
         for name, content in current_dict.items():
             if name in ("_docs", "_subdirs"):
                 continue
-                
+
             # Create folder for current level
             folder_path = os.path.join(current_path, sanitize_filename(name))
             if not os.path.exists(folder_path):
                 os.makedirs(folder_path)
-            
-            # Download documents at this level
-            if content["_docs"]:
-                print(f"\nDownloading PDFs for: {name}")
-                print("="*60)
-                
-                for doc in sorted(content["_docs"], key=lambda x: x['titel']):
-                    filename = sanitize_filename(doc['titel']) + ".pdf"
-                    filepath = os.path.join(folder_path, filename)
-                    
-                    print(f"Downloading: {doc['titel']}")
-                    if download_pdf(doc['link'], filepath):
-                        download_stats["success"] += 1
-                    else:
-                        download_stats["failed"] += 1
-            
-            # Process subdirectories
-            sub_stats = process_hierarchy(content["_subdirs"], folder_path)
-            download_stats["success"] += sub_stats["success"]
-            download_stats["failed"] += sub_stats["failed"]
-        
+
+            for doc in sorted(content["_docs"], key=lambda x: x['titel']):
+                filename = sanitize_filename(doc['titel']) + ".pdf"
+                filepath = os.path.join(folder_path, filename)
+                jobs.append((doc['link'], filepath))
+
+            jobs.extend(collect_download_jobs(content["_subdirs"], folder_path))
+
+        return jobs
+
+    def process_hierarchy(current_dict, current_path):
+        jobs = collect_download_jobs(current_dict, current_path)
+        download_stats = {"success": 0, "failed": 0}
+
+        print(f"\nDownloading {len(jobs)} PDFs...")
+        print("="*60)
+
+        # The downloads are network-bound, so a thread pool over the shared
+        # session overlaps them instead of waiting on each response in turn
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = executor.map(lambda job: download_pdf(job[0], job[1]), jobs)
+            for ok in results:
+                if ok:
+                    download_stats["success"] += 1
+                else:
+                    download_stats["failed"] += 1
+
         return download_stats
 
     # Process the complete hierarchy
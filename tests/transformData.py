@@ -1,106 +1,211 @@
+import numpy as np
 import os
 import spacy
 import chromadb
 from chromadb.config import Settings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pypdf import PdfReader
 import re
 from typing import List, Tuple, Dict
 
+from nlp_loader import get_nlp
+
+# Compiled once at import; these run for every page, section and name
+_WS = re.compile(r'\s+')
+# Pattern for sections like "§ 1", "Artikel 2", "Kapitel 3"
+_SECTION = re.compile(r'(?m)^(\s*(§|Kapitel|Artikel)\s*\d+.*)', re.IGNORECASE)
+_SAFE = re.compile(r'[^a-zA-Z0-9._-]')
+_EDGE = re.compile(r'^[._-]+|[._-]+$')
+_UMLAUT_TRANS = str.maketrans({
+    'ä': 'ae', 'ö': 'oe', 'ü': 'ue',
+    'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue',
+    'ß': 'ss'
+})
+
+# One spaCy model per worker process, warmed by the pool initializer
+_worker_nlp = None
+
+def _init_worker():
+    """Warm the worker-local spaCy model once per process"""
+    global _worker_nlp
+    _worker_nlp = get_nlp()
+
+def extract_segments(pdf_path: str) -> List[Dict]:
+    """Read, clean and segment one PDF (runs in a worker process)"""
+    reader = PdfReader(pdf_path)
+    # One join instead of quadratic += string concatenation across pages
+    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    return segment_study_regulations(clean_text(text), _worker_nlp)
+
 def clean_text(text: str) -> str:
     """Cleanes text"""
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    return _WS.sub(' ', text).strip()
+
+def _finish_chunk(chunks: List[Tuple[str, list]], parts: List[str], sent_vecs: List[Tuple]):
+    """Store one chunk; its vector is derived from the sentence vectors.
+
+    A sentence vector is the mean of its token vectors, so the token-count
+    weighted mean of the sentence vectors equals the vector of the whole
+    chunk — no second nlp() pass over the assembled chunk text needed.
+    """
+    chunk_text = " ".join(parts).strip()
+    total_tokens = sum(n_tokens for _, n_tokens in sent_vecs)
+    if not chunk_text or total_tokens == 0:
+        return
+    # The vector stays a float32 ndarray all the way to collection.add;
+    # tolist() would box every component into Python floats per segment
+    vector = np.sum([vec * n_tokens for vec, n_tokens in sent_vecs], axis=0, dtype=np.float32) / total_tokens
+    if vector.any():
+        chunks.append((chunk_text, vector))
+
+def _doc_chunks(doc) -> List[Tuple[str, "np.ndarray"]]:
+    """Group a section's sentences into ~100 word chunks with vectors"""
+    chunks: List[Tuple[str, "np.ndarray"]] = []
+    # Running word counter and a parts list avoid re-splitting the
+    # accumulated chunk for every sentence
+    current_parts = []
+    current_words = 0
+    current_vecs = []  # (sentence vector, token count) per sentence
+    for sent in doc.sents:
+        sentence = sent.text.strip()
+        sentence_words = len(sentence.split())
+        if current_words + sentence_words <= 100: # chunk size limit
+            current_parts.append(sentence)
+            current_words += sentence_words
+            current_vecs.append((sent.vector, len(sent)))
+        else:
+            if current_parts:
+                _finish_chunk(chunks, current_parts, current_vecs)
+            current_parts = [sentence]
+            current_words = sentence_words
+            current_vecs = [(sent.vector, len(sent))]
+    if current_parts:
+        _finish_chunk(chunks, current_parts, current_vecs)
+    return chunks
+
+def _worth_embedding(text: str) -> bool:
+    """Cheap pre-filter: page-number fragments and stray header lines are
+    dropped before they cost a trip through the pipeline"""
+    return len(text) >= 16 and text.count(' ') >= 2
+
+# Boilerplate sections (Inkrafttreten, Übergangsbestimmungen, …) recur
+# verbatim across many regulations; each unique section body only passes
+# through the pipeline once per process
+_section_cache: Dict[str, List[Tuple[str, "np.ndarray"]]] = {}
+_SECTION_CACHE_MAX = 2048
 
 def segment_study_regulations(text: str, nlp) -> List[Dict]:
     """
-    Chunks an PDF 
+    Chunks an PDF
     """
-    # Pattern for sections like "§ 1", "Artikel 2", "Kapitel 3"
-    pattern = re.compile(r'(?m)^(\s*(§|Kapitel|Artikel)\s*\d+.*)', re.IGNORECASE)
-    
     segments = []
-    
-    # Split the text by the pattern to get logical chunks
-    split_text = re.split(pattern, text)
-    
-    # The first element is usually preamble, subsequent elements are title/content pairs
-    preamble = split_text[0].strip()
-    if preamble:
-        doc = nlp(preamble)
-        if doc.vector_norm:
+
+    # Phase 1: walk the section headers once; each section's content is the
+    # slice between its header and the next one, and the preamble is
+    # everything before the first header
+    matches = list(_SECTION.finditer(text))
+
+    sections = []
+    preamble = (text[:matches[0].start()] if matches else text).strip()
+    if _worth_embedding(preamble):
+        sections.append(('Präambel', preamble))
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        title = match.group(1).strip()
+        end = next_match.start() if next_match else len(text)
+        content = text[match.end():end].strip()
+        if _worth_embedding(content):
+            sections.append((title, content))
+
+    # Phase 2: run the section texts not seen before through the pipeline
+    # in one batch and chunk them; known bodies come from the memo instead
+    seen = set()
+    uncached = []
+    for _, content in sections:
+        if content not in _section_cache and content not in seen:
+            seen.add(content)
+            uncached.append(content)
+
+    fresh = {}
+    for content, doc in zip(uncached, nlp.pipe(uncached, batch_size=32)):
+        chunks = _doc_chunks(doc)
+        fresh[content] = chunks
+        if len(_section_cache) < _SECTION_CACHE_MAX:
+            _section_cache[content] = chunks
+
+    # The title is attached here because the same boilerplate body can
+    # appear under different section titles
+    for title, content in sections:
+        for chunk_text, vector in _section_cache.get(content, fresh.get(content, [])):
             segments.append({
-                'text': preamble,
-                'metadata': {'title': 'Präambel'},
-                'vector': doc.vector.tolist()
+                'text': chunk_text,
+                'metadata': {'title': title},
+                'vector': vector
             })
-    
-    # Process the rest of the splits
-    for i in range(1, len(split_text), 4): # 
-        title = split_text[i].strip()
-        content = split_text[i+3].strip()
 
-        if not content:
-            continue
-            
-        doc = nlp(content)
-        # Split content into smaller, context-rich chunks 
-        sentences = [sent.text.strip() for sent in doc.sents]
-        
-        current_chunk = ""
-        for sentence in sentences:
-            if len(current_chunk.split()) + len(sentence.split()) <= 100: # chunk size limit
-                current_chunk += " " + sentence
-            else:
-                if current_chunk:
-                    chunk_doc = nlp(current_chunk)
-                    if chunk_doc.vector_norm:
-                        segments.append({
-                            'text': current_chunk.strip(),
-                            'metadata': {'title': title},
-                            'vector': chunk_doc.vector.tolist()
-                        })
-                current_chunk = sentence
-        
-        if current_chunk:
-            chunk_doc = nlp(current_chunk)
-            if chunk_doc.vector_norm:
-                segments.append({
-                    'text': current_chunk.strip(),
-                    'metadata': {'title': title},
-                    'vector': chunk_doc.vector.tolist()
-                })
-    
     return segments
 
 def sanitize_collection_name(name: str) -> str:
     """Convert a string to a valid ChromaDB collection name"""
-    # Replace umlauts
-    name = name.replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue')
-    name = name.replace('Ä', 'Ae').replace('Ö', 'Oe').replace('Ü', 'Ue')
-    name = name.replace('ß', 'ss')
-    
+    # Replace umlauts in one table-driven pass
+    name = name.translate(_UMLAUT_TRANS)
+
     # Replace spaces and other special characters
-    name = re.sub(r'[^a-zA-Z0-9._-]', '_', name)
-    
+    name = _SAFE.sub('_', name)
+
     # Ensure it starts and ends with alphanumeric
-    name = re.sub(r'^[._-]+', '', name)
-    name = re.sub(r'[._-]+$', '', name)
-    
-    return name
+    return _EDGE.sub('', name)
 
-def process_pdf_directory(base_dir: str):
-    """Process all PDFs in directory structure with persistent storage"""
+def _tune_sqlite_for_bulk_load(client):
+    """Relax SQLite durability on Chroma's database for this ingest run.
+
+    Journaling and fsync dominate the write path when thousands of small
+    rows are inserted. A crash mid-ingest can corrupt the store with these
+    pragmas, which is acceptable here: the database is rebuilt from the
+    PDFs anyway. Reaches into Chroma's private connection pool (in 0.4.24
+    the SegmentAPI hangs off client._server), so every failure is swallowed
+    and the run continues with default settings. The pool hands out one
+    connection per thread, so this must run on the thread that does the
+    adds — both ingest functions tune and write on the main thread.
+    """
     try:
-        nlp = spacy.load("de_core_news_lg")
-    except OSError:
+        conn = client._server._sysdb._conn_pool.connect()
+        for pragma in ("journal_mode=OFF", "synchronous=OFF", "temp_store=MEMORY", "cache_size=-64000"):
+            conn.execute(f"PRAGMA {pragma}")
+        print("SQLite bulk-load pragmas applied")
+    except Exception as e:
+        print(f"Could not apply SQLite bulk-load pragmas (continuing without): {e}")
+
+# Segments are buffered and written to ChromaDB in batches of this size;
+# per-segment add() calls pay the insert overhead hundreds of times per PDF
+_FLUSH_SIZE = 200
+
+def _flush_segments(collection, batch: Dict[str, List]):
+    """Write the buffered segments to the collection and clear the buffer"""
+    if not batch['ids']:
+        return
+    collection.add(
+        documents=batch['documents'],
+        embeddings=np.asarray(batch['embeddings'], dtype=np.float32),
+        metadatas=batch['metadatas'],
+        ids=batch['ids']
+    )
+    for values in batch.values():
+        values.clear()
+
+def process_pdf_directory(base_dir: str, bulk_load: bool = True):
+    """Process all PDFs in directory structure with persistent storage"""
+    # The model itself is loaded by the worker processes; the parent only
+    # makes sure it is installed before the pool starts
+    if not spacy.util.is_package("de_core_news_lg"):
         print("Installing German language model...")
         os.system("python -m spacy download de_core_news_lg")
-        nlp = spacy.load("de_core_news_lg")
 
     # Create persistent client with specified path
     persist_directory = os.path.join(os.path.dirname(__file__), "chroma_db")
     client = chromadb.PersistentClient(path=persist_directory)
-    
+    if bulk_load:
+        _tune_sqlite_for_bulk_load(client)
+
     # Create or get collection with sanitized name
     collection_name = sanitize_collection_name("Prüfungsordnungen")
     collection = client.get_or_create_collection(
@@ -112,55 +217,60 @@ def process_pdf_directory(base_dir: str):
     )
     
     doc_id = collection.count()  # Start from existing count
-    
+    batch = {'documents': [], 'embeddings': [], 'metadatas': [], 'ids': []}
+
+    # Collect the PDF jobs first, then extract and segment them in worker
+    # processes; only the parent touches the ChromaDB client
+    jobs = []
     for root, _, files in os.walk(base_dir):
+        # The relative path and its metadata fields are the same for every
+        # PDF in this directory, so build them once per root
+        relative_path = os.path.relpath(root, base_dir)
+        path_meta = {
+            f'path_level_{i+1}': component
+            for i, component in enumerate(relative_path.split(os.sep))
+            if component  # Skip empty components
+        }
         for file in files:
             if not file.lower().endswith('.pdf'):
                 continue
-                
-            pdf_path = os.path.join(root, file)
-            relative_path = os.path.relpath(root, base_dir)
-            path_components = relative_path.split(os.sep)
-            
-            print(f"Processing: {pdf_path}")
-            
+            jobs.append((os.path.join(root, file), file, path_meta))
+
+    max_workers = min(os.cpu_count() or 1, 6)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(extract_segments, job[0]): job for job in jobs}
+        for future in as_completed(futures):
+            pdf_path, file, path_meta = futures[future]
             try:
-                reader = PdfReader(pdf_path)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                clean_text_content = clean_text(text)
-                segments = segment_study_regulations(clean_text_content, nlp)
-                
-                for segment in segments:
-                    # Enrich metadata with path information
-                    metadata = segment['metadata']
-                    metadata['file'] = file
-                    metadata['full_path'] = pdf_path
-                    
-                    # Add path components as separate metadata fields
-                    for i, component in enumerate(path_components):
-                        if component:  # Skip empty components
-                            metadata[f'path_level_{i+1}'] = component
-                    
-                    collection.add(
-                        documents=[segment['text']],
-                        embeddings=[segment['vector']],
-                        metadatas=[metadata],
-                        ids=[f"doc_{doc_id}"]
-                    )
-                    doc_id += 1
-                    
+                segments = future.result()
             except Exception as e:
                 print(f"Error processing {pdf_path}: {e}")
-                continue               
+                continue
+            print(f"Processed: {pdf_path}")
+
+            for segment in segments:
+                # Enrich metadata with path information
+                metadata = segment['metadata']
+                metadata['file'] = file
+                metadata['full_path'] = pdf_path
+                metadata.update(path_meta)
+
+                batch['documents'].append(segment['text'])
+                batch['embeddings'].append(segment['vector'])
+                batch['metadatas'].append(metadata)
+                batch['ids'].append(f"doc_{doc_id}")
+                doc_id += 1
+                if len(batch['ids']) >= _FLUSH_SIZE:
+                    _flush_segments(collection, batch)
+
+    # Write whatever is left in the buffer
+    _flush_segments(collection, batch)
 
-    # Ensure changes are persisted
-    client.persist()
+    # PersistentClient writes through to disk on every add; there is no
+    # separate persist step anymore
     print(f"\nData persisted to: {persist_directory}")
 
-def process_multiple_directories():
+def process_multiple_directories(bulk_load: bool = True):
     """Process both regulation types with their specific categories"""
     
     # Define directory configurations
@@ -176,15 +286,14 @@ def process_multiple_directories():
             'display_name': "Fakultätsordnungen"
         }
     ]
-    
-    
-    nlp = spacy.load("de_core_news_lg")
-    
+
 
     # Create persistent client
     persist_directory = os.path.join(os.path.dirname(__file__), "chroma_db")
     client = chromadb.PersistentClient(path=persist_directory)
-    
+    if bulk_load:
+        _tune_sqlite_for_bulk_load(client)
+
     # Create or get collection for all regulations
     collection = client.get_or_create_collection(
         name="university_regulations",
@@ -192,62 +301,65 @@ def process_multiple_directories():
     )
     
     doc_id = collection.count()
-    
-    # Process each directory
+    batch = {'documents': [], 'embeddings': [], 'metadatas': [], 'ids': []}
+
+    # Collect the PDF jobs from every directory first, then extract and
+    # segment them in worker processes; only the parent writes to ChromaDB
+    jobs = []
     for dir_config in directories:
         base_dir = dir_config['path']
         if not os.path.exists(base_dir):
             print(f"\nSkipping {dir_config['display_name']}: Directory not found")
             continue
-            
-        print(f"\nProcessing {dir_config['display_name']} from: {base_dir}")
-        
+
+        print(f"\nCollecting {dir_config['display_name']} from: {base_dir}")
+
         for root, _, files in os.walk(base_dir):
+            # Path metadata is identical for every PDF in this directory
+            relative_path = os.path.relpath(root, base_dir)
+            path_meta = {
+                f'path_level_{i+1}': component
+                for i, component in enumerate(relative_path.split(os.sep))
+                if component
+            }
             for file in files:
                 if not file.lower().endswith('.pdf'):
                     continue
-                    
-                pdf_path = os.path.join(root, file)
-                relative_path = os.path.relpath(root, base_dir)
-                path_components = relative_path.split(os.sep)
-                
-                print(f"Processing: {pdf_path}")
-                
-                try:
-                    reader = PdfReader(pdf_path)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    
-                    clean_text_content = clean_text(text)
-                    segments = segment_study_regulations(clean_text_content, nlp)
-                    
-                    for segment in segments:
-                        # Enrich metadata
-                        metadata = segment['metadata']
-                        metadata.update({
-                            'file': file,
-                            'full_path': pdf_path,
-                            'category': dir_config['category'],
-                            'category_display': dir_config['display_name']
-                        })
-                        
-                        # Add path components as metadata
-                        for i, component in enumerate(path_components):
-                            if component:
-                                metadata[f'path_level_{i+1}'] = component
-                        
-                        collection.add(
-                            documents=[segment['text']],
-                            embeddings=[segment['vector']],
-                            metadatas=[metadata],
-                            ids=[f"doc_{doc_id}"]
-                        )
-                        doc_id += 1
-                        
-                except Exception as e:
-                    print(f"Error processing {pdf_path}: {e}")
-                    continue
+                jobs.append((os.path.join(root, file), file, path_meta, dir_config))
+
+    max_workers = min(os.cpu_count() or 1, 6)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        futures = {executor.submit(extract_segments, job[0]): job for job in jobs}
+        for future in as_completed(futures):
+            pdf_path, file, path_meta, dir_config = futures[future]
+            try:
+                segments = future.result()
+            except Exception as e:
+                print(f"Error processing {pdf_path}: {e}")
+                continue
+            print(f"Processed: {pdf_path}")
+
+            for segment in segments:
+                # Enrich metadata
+                metadata = segment['metadata']
+                metadata.update({
+                    'file': file,
+                    'full_path': pdf_path,
+                    'category': dir_config['category'],
+                    'category_display': dir_config['display_name']
+                })
+                metadata.update(path_meta)
+
+                batch['documents'].append(segment['text'])
+                batch['embeddings'].append(segment['vector'])
+                batch['metadatas'].append(metadata)
+                batch['ids'].append(f"doc_{doc_id}")
+                doc_id += 1
+                if len(batch['ids']) >= _FLUSH_SIZE:
+                    _flush_segments(collection, batch)
+
+    # Write whatever is left in the buffer
+    _flush_segments(collection, batch)
 
     print(f"\nAll data persisted to: {persist_directory}")
 